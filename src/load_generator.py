@@ -0,0 +1,127 @@
+"""
+Drive `generate_in_toon` at a target request rate and report throughput and latency.
+
+    # against a mock started in-process
+    python -m src.load_generator --start-mock --qps 20 --duration 30 --latency 0.2 --rate-limit 15
+
+    # against an already running server
+    python -m src.load_generator --base-url http://127.0.0.1:8089/v1 --qps 50 --duration 60
+
+Requests are sent open-loop (request i is due at i / qps seconds), and latency is measured
+from the due time, so queueing behind a saturated worker pool shows up in the numbers.
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from src.mock_openai_server import add_config_arguments, config_from_args, start_server
+
+DEFAULT_INSTRUCTION = "Summarize this dataset with top performer and average score."
+DEFAULT_DATA = json.dumps({
+    "students": [
+        {"id": 1, "name": "Alice", "score": 95},
+        {"id": 2, "name": "Bob", "score": 88},
+        {"id": 3, "name": "Cara", "score": 92},
+    ]
+})
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    k = max(0, min(len(values) - 1, round(pct / 100 * len(values)) - 1))
+    return values[k]
+
+
+def run_load(qps: float, duration: float, concurrency: int, model: str,
+             instruction: str = DEFAULT_INSTRUCTION, data: str = DEFAULT_DATA) -> dict:
+    """Send `qps * duration` requests through `generate_in_toon` and summarize the results."""
+    # Imported here: the module builds its OpenAI client from the environment at import time
+    from src.llm_toon_generator import generate_in_toon
+
+    latencies, errors = [], Counter()
+    lock = threading.Lock()
+
+    def one_request(due: float):
+        try:
+            generate_in_toon(model, instruction, data)
+        except Exception as e:
+            with lock:
+                errors[type(e).__name__] += 1
+            return
+        elapsed = time.perf_counter() - due
+        with lock:
+            latencies.append(elapsed)
+
+    total = int(qps * duration)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i in range(total):
+            due = start + i / qps
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(one_request, due)
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "target_qps": qps,
+        "sent": total,
+        "ok": len(latencies),
+        "errors": dict(errors),
+        "wall_sec": round(wall, 3),
+        "achieved_qps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency_sec": {
+            "mean": round(statistics.fmean(latencies), 4) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 4),
+            "p90": round(percentile(latencies, 90), 4),
+            "p99": round(percentile(latencies, 99), 4),
+            "max": round(latencies[-1], 4) if latencies else 0.0,
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test generate_in_toon against an OpenAI-compatible endpoint")
+    parser.add_argument("--qps", type=float, default=10.0, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="Test length in seconds")
+    parser.add_argument("--concurrency", type=int, default=32, help="Worker threads")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--base-url", help="OpenAI-compatible base URL, e.g. http://127.0.0.1:8089/v1")
+    parser.add_argument("--start-mock", action="store_true", help="Start the mock server in this process")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    if args.start_mock:
+        server = start_server(config_from_args(args))
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "mock")
+        print(f"🧪 Mock server started at {server.base_url}")
+    elif args.base_url:
+        os.environ["OPENAI_BASE_URL"] = args.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "mock")
+
+    print(f"⏳ Sending {int(args.qps * args.duration)} requests at {args.qps} QPS...\n")
+    report = run_load(args.qps, args.duration, args.concurrency, args.model)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        lat = report["latency_sec"]
+        print("📊 Load Test Summary")
+        print("-" * 40)
+        print(f"Sent / OK        : {report['sent']} / {report['ok']}")
+        print(f"Errors           : {report['errors'] or 'none'}")
+        print(f"Target QPS       : {report['target_qps']}")
+        print(f"Achieved QPS     : {report['achieved_qps']}")
+        print(f"Latency mean     : {lat['mean']:.3f}s")
+        print(f"Latency p50/p90  : {lat['p50']:.3f}s / {lat['p90']:.3f}s")
+        print(f"Latency p99/max  : {lat['p99']:.3f}s / {lat['max']:.3f}s")
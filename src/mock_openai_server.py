@@ -0,0 +1,332 @@
+"""
+Local OpenAI-compatible mock server for offline load testing.
+
+Serves `POST /v1/chat/completions` and `POST /v1/responses` (with `"stream": true`
+support) so `generate_in_toon` and the `ask_llm` helpers can run without the real API:
+
+    python -m src.mock_openai_server --port 8089 --latency 0.2 --tokens-per-sec 400
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=mock python tests/test_llm_toon_generation.py
+
+Replies are either replayed from a JSONL file (`--replay`, one `{"content": "..."}` per
+line, optionally with a `"match"` substring of the user prompt) or synthetic TOON.
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from src.toon_encoder import encode_toon
+
+_TOKEN_RE = re.compile(r"\S+\s*|\s+")
+
+_NAMES = ["Alice", "Bob", "Cara", "Dan", "Eve", "Frank", "Grace", "Henry", "Ivy", "Jack"]
+_ROLES = ["Engineer", "Manager", "Analyst", "Designer", "Scientist"]
+
+
+@dataclass
+class MockConfig:
+    latency: float = 0.0          # seconds before the first token
+    jitter: float = 0.0           # extra random latency, uniform in [0, jitter]
+    tokens_per_sec: float = 0.0   # output token rate, streamed or not; 0 = instant
+    error_rate: float = 0.0       # share of requests answered with HTTP 500
+    rate_limit: float = 0.0       # allowed requests per second, 0 = unlimited
+    replay: Optional[str] = None  # JSONL file with recorded responses
+    seed: Optional[int] = None
+
+
+class _TokenBucket:
+    """Requests-per-second limiter behind the injected 429 responses."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        # Room for at least one request, or limits below 1 rps would never admit any
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one request slot; return 0 on success or the seconds to wait otherwise."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+def synthetic_toon(rng: random.Random) -> str:
+    """Build a small random TOON document."""
+    rows = [
+        {"id": i + 1, "name": rng.choice(_NAMES), "role": rng.choice(_ROLES), "score": rng.randint(50, 100)}
+        for i in range(rng.randint(2, 6))
+    ]
+    scores = [r["score"] for r in rows]
+    return encode_toon({
+        "records": rows,
+        "summary": {"count": len(rows), "top_score": max(scores), "avg_score": round(sum(scores) / len(rows), 1)},
+    })
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: MockConfig):
+        super().__init__(address, _Handler)
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.rng_lock = threading.Lock()
+        self.bucket = _TokenBucket(config.rate_limit) if config.rate_limit > 0 else None
+        self.recordings = []
+        if config.replay:
+            with open(config.replay, encoding="utf-8") as f:
+                self.recordings = [json.loads(line) for line in f if line.strip()]
+        self._cycle = itertools.cycle(range(len(self.recordings))) if self.recordings else None
+
+    def stop(self):
+        """Stop the thread started by `start_server` and close the listening socket."""
+        self.shutdown()
+        self.server_close()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def random(self) -> float:
+        with self.rng_lock:
+            return self.rng.random()
+
+    def reply_for(self, prompt: str) -> str:
+        """Pick a recorded reply (matching the prompt if possible) or make a synthetic one."""
+        if self.recordings:
+            for rec in self.recordings:
+                if rec.get("match") and rec["match"] in prompt:
+                    return rec["content"]
+            with self.rng_lock:
+                return self.recordings[next(self._cycle)]["content"]
+        with self.rng_lock:
+            return synthetic_toon(self.rng)
+
+
+def _prompt_text(body: dict) -> str:
+    """Flatten the user-visible prompt of a chat or responses request."""
+    if "messages" in body:
+        return "\n".join(str(m.get("content", "")) for m in body["messages"])
+    inp = body.get("input", "")
+    if isinstance(inp, list):
+        return "\n".join(str(m.get("content", "")) for m in inp if isinstance(m, dict))
+    return str(inp)
+
+
+def _count_tokens(text: str) -> int:
+    return len(_TOKEN_RE.findall(text))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockOpenAIServer
+
+    def log_message(self, format, *args):
+        pass
+
+    # ---------- Helpers ----------
+    def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: int, message: str, err_type: str, headers: Optional[dict] = None):
+        self._send_json(status, {"error": {"message": message, "type": err_type, "param": None, "code": None}}, headers)
+
+    def _start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+    def _send_event(self, payload, event: Optional[str] = None):
+        data = payload if isinstance(payload, str) else json.dumps(payload)
+        prefix = f"event: {event}\n" if event else ""
+        self.wfile.write(f"{prefix}data: {data}\n\n".encode())
+        self.wfile.flush()
+
+    def _chunks(self, text: str):
+        """Yield the reply piece by piece at the configured token rate."""
+        rate = self.server.config.tokens_per_sec
+        pieces = _TOKEN_RE.findall(text)
+        if rate <= 0:
+            yield text
+            return
+        start = time.monotonic()
+        for i, piece in enumerate(pieces):
+            delay = start + i / rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            yield piece
+
+    def _wait_for_generation(self, completion_tokens: int):
+        """Hold a non-streaming reply for as long as streaming it at the token rate would take."""
+        rate = self.server.config.tokens_per_sec
+        if rate > 0:
+            time.sleep(completion_tokens / rate)
+
+    # ---------- Routing ----------
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock-model", "object": "model", "owned_by": "mock"}]})
+        else:
+            self._send_error(404, f"Unknown path {self.path}", "invalid_request_error")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_error(400, "Request body is not valid JSON", "invalid_request_error")
+            return
+
+        path = self.path.split("?")[0].rstrip("/")
+        if path.endswith("/chat/completions"):
+            handler = self._chat_completions
+        elif path.endswith("/responses"):
+            handler = self._responses
+        else:
+            self._send_error(404, f"Unknown path {self.path}", "invalid_request_error")
+            return
+
+        config = self.server.config
+        if self.server.bucket is not None:
+            wait = self.server.bucket.acquire()
+            if wait:
+                self._send_error(429, "Rate limit reached for requests", "requests",
+                                 {"Retry-After": f"{wait:.3f}", "x-ratelimit-remaining-requests": "0"})
+                return
+        if config.error_rate and self.server.random() < config.error_rate:
+            self._send_error(500, "Injected server error", "server_error")
+            return
+
+        delay = config.latency + (config.jitter * self.server.random() if config.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+        prompt = _prompt_text(body)
+        handler(body, prompt, self.server.reply_for(prompt))
+
+    # ---------- Endpoints ----------
+    def _chat_completions(self, body: dict, prompt: str, reply: str):
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        model = body.get("model", "mock-model")
+        usage = {"prompt_tokens": _count_tokens(prompt), "completion_tokens": _count_tokens(reply)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if not body.get("stream"):
+            self._wait_for_generation(usage["completion_tokens"])
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        def chunk(delta: dict, finish_reason=None) -> dict:
+            return {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+        self._start_stream()
+        self._send_event(chunk({"role": "assistant", "content": ""}))
+        for piece in self._chunks(reply):
+            self._send_event(chunk({"content": piece}))
+        self._send_event(chunk({}, "stop"))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self._send_event({**chunk({}), "choices": [], "usage": usage})
+        self._send_event("[DONE]")
+
+    def _responses(self, body: dict, prompt: str, reply: str):
+        response_id = f"resp_{uuid.uuid4().hex[:24]}"
+        item_id = f"msg_{uuid.uuid4().hex[:24]}"
+        usage = {"input_tokens": _count_tokens(prompt), "output_tokens": _count_tokens(reply)}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+
+        def response(status: str, text: Optional[str]) -> dict:
+            output = [] if text is None else [{
+                "type": "message", "id": item_id, "status": "completed", "role": "assistant",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }]
+            return {"id": response_id, "object": "response", "created_at": int(time.time()),
+                    "model": body.get("model", "mock-model"), "status": status, "output": output,
+                    "usage": usage if text is not None else None}
+
+        if not body.get("stream"):
+            self._wait_for_generation(usage["output_tokens"])
+            self._send_json(200, response("completed", reply))
+            return
+
+        self._start_stream()
+        seq = itertools.count()
+        self._send_event({"type": "response.created", "sequence_number": next(seq),
+                          "response": response("in_progress", None)}, "response.created")
+        for piece in self._chunks(reply):
+            self._send_event({"type": "response.output_text.delta", "sequence_number": next(seq), "item_id": item_id,
+                              "output_index": 0, "content_index": 0, "delta": piece}, "response.output_text.delta")
+        self._send_event({"type": "response.output_text.done", "sequence_number": next(seq), "item_id": item_id,
+                          "output_index": 0, "content_index": 0, "text": reply}, "response.output_text.done")
+        self._send_event({"type": "response.completed", "sequence_number": next(seq),
+                          "response": response("completed", reply)}, "response.completed")
+
+
+def start_server(config: MockConfig, host: str = "127.0.0.1", port: int = 0) -> MockOpenAIServer:
+    """Start the mock server on a background thread and return it (port 0 picks a free port)."""
+    server = MockOpenAIServer((host, port), config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency in seconds")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0, help="Output token rate (0 = instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with HTTP 500")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requests per second before HTTP 429")
+    parser.add_argument("--replay", help="JSONL file of recorded responses")
+    parser.add_argument("--seed", type=int, help="Random seed for synthetic replies and error injection")
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(latency=args.latency, jitter=args.jitter, tokens_per_sec=args.tokens_per_sec,
+                      error_rate=args.error_rate, rate_limit=args.rate_limit, replay=args.replay, seed=args.seed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockOpenAIServer((args.host, args.port), config_from_args(args))
+    print(f"🧪 Mock OpenAI server listening on {server.base_url}")
+    print(f"   export OPENAI_BASE_URL={server.base_url} OPENAI_API_KEY=mock")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,228 @@
+"""
+Token-budgeted, lossy TOON encoding behind `encode_toon(data, max_tokens=N, strategy=...)`.
+
+When the full encoding does not fit, tables are cut down to a subset of their rows.
+Headers keep the original row count, a `#sampled[k]: <strategy>` line says how many rows
+are shown, and an `#omitted` table summarizes the rows left out (count, min, max, mean
+and distinct values per column).
+
+Each row is encoded and tokenized once up front; the search then works on those
+per-row counts, and only the final candidate is encoded and counted again to verify it.
+"""
+import json
+import math
+import statistics
+from typing import Any, Callable, Optional
+
+from src.toon_encoder import ToonEncoder, ToonOptions, _SampledRows, _table_columns
+
+STRATEGIES = ("head_tail", "stratified", "top_k")
+
+# Re-encodings allowed to correct the per-row estimate before giving up.
+_MAX_ATTEMPTS = 8
+
+
+def _tiktoken_counter() -> Callable[[str], int]:
+    try:
+        import tiktoken
+    except ImportError as e:
+        raise ImportError("max_tokens needs tiktoken (pip install tiktoken) or a token_counter") from e
+    enc = tiktoken.get_encoding("o200k_base")
+    return lambda text: len(enc.encode(text, disallowed_special=()))
+
+
+def _hashable(v: Any) -> Any:
+    if isinstance(v, (dict, list)):
+        return json.dumps(v, sort_keys=True, default=str)
+    return v
+
+
+def _is_number(v: Any) -> bool:
+    return type(v) in (int, float)
+
+
+def _find_tables(data: Any, opts: ToonOptions, found: list):
+    """Collect (rows, columns) of every list that the encoder would write as a table."""
+    if isinstance(data, dict):
+        for v in data.values():
+            _find_tables(v, opts, found)
+    elif isinstance(data, list) and data:
+        columns = _table_columns(data, opts.min_density)
+        if columns:
+            found.append((data, columns))
+        else:
+            for item in data:
+                _find_tables(item, opts, found)
+
+
+def _default_stratum(rows: list, columns: list):
+    """First column of short, repeated primitive values (e.g. a category), if any."""
+    limit = max(2, math.isqrt(len(rows)))
+    for col in columns:
+        values = [row.get(col) for row in rows]
+        if not all(isinstance(v, (str, bool)) or v is None for v in values):
+            continue
+        if 1 < len(set(values)) <= limit:
+            return col
+    return None
+
+
+def _row_order(rows: list, columns: list, strategy: str, sort_by, stratify_by):
+    """Return (row indices from most to least worth keeping, label for the `#sampled` line)."""
+    n = len(rows)
+    if strategy == "top_k" and sort_by in columns:
+        def key(i):
+            v = rows[i].get(sort_by)
+            return (1, v) if _is_number(v) else (0, 0)
+        return sorted(range(n), key=key, reverse=True), f"top_k {sort_by}"
+
+    if strategy == "stratified":
+        col = stratify_by if stratify_by in columns else _default_stratum(rows, columns)
+        groups = {}
+        for i, row in enumerate(rows):
+            groups.setdefault(_hashable(row.get(col)), []).append(i)
+        # Interleave groups so that every prefix keeps them in proportion
+        ranked = sorted(((j + 0.5) / len(idx), i) for idx in groups.values() for j, i in enumerate(idx))
+        return [i for _, i in ranked], f"stratified {col}" if col is not None else "stratified"
+
+    # head_tail (also the fallback for tables without the sort column)
+    order = []
+    lo, hi = 0, n - 1
+    while lo <= hi:
+        order.append(lo)
+        if lo != hi:
+            order.append(hi)
+        lo, hi = lo + 1, hi - 1
+    return order, "head_tail"
+
+
+def _summarize(rows: list, columns: list) -> list:
+    """Per-column statistics of the omitted rows."""
+    summary = []
+    for col in columns:
+        values = [row[col] for row in rows if row.get(col) is not None]
+        entry = {"column": str(col), "count": len(values)}
+        if values and all(_is_number(v) for v in values):
+            entry["min"] = min(values)
+            entry["max"] = max(values)
+            entry["mean"] = round(statistics.fmean(values), 4)
+        entry["distinct"] = len({_hashable(v) for v in values})
+        summary.append(entry)
+    return summary
+
+
+class _TablePlan:
+    def __init__(self, rows: list, columns: list, encoder: ToonEncoder, count: Callable[[str], int],
+                 strategy: str, sort_by, stratify_by):
+        self.rows = rows
+        self.columns = columns
+        self.order, self.label = _row_order(rows, columns, strategy, sort_by, stratify_by)
+
+        # Tokens of each row line (+1 for its newline); child-table lines are shared out evenly
+        lines = []
+        encoder._write_table("t", rows, columns, 0, lines)
+        n = len(rows)
+        row_costs = [count(line) + 1 for line in lines[1:n + 1]]
+        child_share = sum(count(line) + 1 for line in lines[n + 1:]) / n
+        self.cumulative = [0.0]
+        for i in self.order:
+            self.cumulative.append(self.cumulative[-1] + row_costs[i] + child_share)
+
+    def cost(self, k: int) -> float:
+        return self.cumulative[k]
+
+    def sample(self, k: int):
+        if k >= len(self.rows):
+            return self.rows
+        keep = sorted(self.order[:k])
+        kept_set = set(keep)
+        omitted = [row for i, row in enumerate(self.rows) if i not in kept_set]
+        return _SampledRows([self.rows[i] for i in keep], self.columns, len(self.rows), self.label,
+                            _summarize(omitted, self.columns))
+
+
+def _allocate(plans: list, budget: float) -> list:
+    """Rows to keep per table: the same share of every table, then leftovers greedily."""
+    def ks_for(f):
+        return [min(len(p.rows), math.floor(f * len(p.rows))) for p in plans]
+
+    def total(ks):
+        return sum(p.cost(k) for p, k in zip(plans, ks))
+
+    lo, hi = 0.0, 1.0
+    for _ in range(40):
+        mid = (lo + hi) / 2
+        if total(ks_for(mid)) <= budget:
+            lo = mid
+        else:
+            hi = mid
+    ks = ks_for(lo)
+
+    remaining = budget - total(ks)
+    progress = True
+    while progress:
+        progress = False
+        for t, p in enumerate(plans):
+            if ks[t] < len(p.rows):
+                step = p.cost(ks[t] + 1) - p.cost(ks[t])
+                if step <= remaining:
+                    ks[t] += 1
+                    remaining -= step
+                    progress = True
+    return ks
+
+
+def _rebuild(data: Any, replacements: dict, tables: set) -> Any:
+    """Copy the containers around the sampled tables, leaving everything else shared."""
+    if isinstance(data, dict):
+        return {k: _rebuild(v, replacements, tables) for k, v in data.items()}
+    if isinstance(data, list):
+        if id(data) in replacements:
+            return replacements[id(data)]
+        if id(data) in tables:
+            return data
+        return [_rebuild(x, replacements, tables) for x in data]
+    return data
+
+
+def encode_within_budget(data: Any, indent: int, encoder: ToonEncoder, max_tokens: int, strategy: str = "head_tail",
+                         sort_by: Any = None, stratify_by: Any = None,
+                         token_counter: Optional[Callable[[str], int]] = None) -> str:
+    """Encode `data`, sampling table rows until the output fits in `max_tokens`."""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy {strategy!r}; use one of {', '.join(STRATEGIES)}")
+    if strategy == "top_k" and sort_by is None:
+        raise ValueError("strategy='top_k' needs sort_by")
+    count = token_counter or _tiktoken_counter()
+
+    full = encoder.encode(data, indent)
+    full_tokens = count(full)
+    if full_tokens <= max_tokens:
+        return full
+
+    found = []
+    _find_tables(data, encoder.options, found)
+    if not found:
+        raise ValueError(f"Output needs {full_tokens} tokens and has no tables to sample")
+
+    plans = [_TablePlan(rows, columns, encoder, count, strategy, sort_by, stratify_by) for rows, columns in found]
+    tables = {id(p.rows) for p in plans}
+
+    def render(ks):
+        replacements = {id(p.rows): p.sample(k) for p, k in zip(plans, ks) if k < len(p.rows)}
+        return encoder.encode(_rebuild(data, replacements, tables), indent)
+
+    # Headers, summaries and everything outside the tables
+    skeleton = count(render([0] * len(plans)))
+    if skeleton > max_tokens:
+        raise ValueError(f"Even with no table rows the output needs {skeleton} tokens (budget {max_tokens})")
+
+    budget = max_tokens - skeleton
+    for _ in range(_MAX_ATTEMPTS):
+        ks = _allocate(plans, budget)
+        text = render(ks)
+        used = count(text)
+        if used <= max_tokens:
+            return text
+        budget -= used - max_tokens
+    return render([0] * len(plans))
@@ -0,0 +1,311 @@
+"""
+`toon` command-line converter between JSON/JSONL and TOON.
+
+    cat records.jsonl | python -m src.toon_cli > records.toon          # stream stdin -> stdout
+    python -m src.toon_cli --decode < records.toon > records.jsonl     # and back
+    python -m src.toon_cli "data/*.json" -o out/ -j 8 --stats          # files/globs in parallel
+    python -m src.toon_cli data/big.jsonl --bench
+
+JSONL input is converted record by record with constant memory; in TOON output the
+records are separated by a `---` line. `main()` is the entry point for a `toon` script.
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional, TextIO
+
+from src.toon_decoder import decode_toon
+from src.toon_encoder import DEFAULT_MIN_DENSITY, encode_toon
+
+RECORD_SEPARATOR = "---"
+
+
+# ---------- Token counting ----------
+def _token_counter():
+    """Return (count_fn, exact): tiktoken's o200k_base when installed, else a ~4 chars/token estimate."""
+    try:
+        import tiktoken
+    except ImportError:
+        return (lambda text: (len(text) + 3) // 4), False
+    enc = tiktoken.get_encoding("o200k_base")
+    return (lambda text: len(enc.encode(text, disallowed_special=()))), True
+
+
+class Stats:
+    """Running byte and token totals of one conversion."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.records = 0
+        self.json_bytes = self.toon_bytes = 0
+        self.json_tokens = self.toon_tokens = 0
+        self._count, self.exact = _token_counter()
+
+    def add(self, json_text: str, toon_text: str):
+        self.records += 1
+        self.json_bytes += len(json_text.encode())
+        self.toon_bytes += len(toon_text.encode())
+        self.json_tokens += self._count(json_text)
+        self.toon_tokens += self._count(toon_text)
+
+    def as_dict(self) -> dict:
+        saved = 1 - self.toon_tokens / self.json_tokens if self.json_tokens else 0.0
+        return {"file": self.name, "records": self.records, "json_bytes": self.json_bytes,
+                "toon_bytes": self.toon_bytes, "json_tokens": self.json_tokens,
+                "toon_tokens": self.toon_tokens, "token_savings": round(saved * 100, 2),
+                "exact_tokens": self.exact}
+
+
+# ---------- Streaming conversion ----------
+def _json_records(lines: Iterable[str]):
+    """
+    Yield records from JSONL, or the single document of a (possibly multi-line) JSON input.
+    Only a multi-line JSON document is held in memory as a whole.
+    """
+    lines = iter(lines)
+    for first in lines:
+        if first.strip():
+            break
+    else:
+        return
+
+    try:
+        record = json.loads(first)
+    except ValueError:
+        # Not one record per line: parse the whole input as one document
+        yield json.loads(first + "".join(lines))
+        return
+
+    yield record
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _toon_records(lines: Iterable[str]):
+    """Yield the TOON text of each `---`-separated record."""
+    buf = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line == RECORD_SEPARATOR:
+            if buf:
+                yield "\n".join(buf)
+            buf = []
+        else:
+            buf.append(line)
+    if any(line.strip() for line in buf):
+        yield "\n".join(buf)
+
+
+def encode_stream(lines: Iterable[str], out: TextIO, options: dict, stats: Optional[Stats] = None):
+    """Convert JSON/JSONL lines to TOON records, writing each as soon as it is encoded."""
+    for i, record in enumerate(_json_records(lines)):
+        toon = encode_toon(record, **options)
+        if i:
+            out.write(f"{RECORD_SEPARATOR}\n")
+        out.write(toon)
+        out.write("\n")
+        if stats is not None:
+            stats.add(json.dumps(record, ensure_ascii=False), toon)
+
+
+def decode_stream(lines: Iterable[str], out: TextIO, indent: Optional[int] = None,
+                  stats: Optional[Stats] = None, expand_paths: bool = False):
+    """Convert `---`-separated TOON records to one JSON document per record."""
+    for toon in _toon_records(lines):
+        text = json.dumps(decode_toon(toon, expand_paths), ensure_ascii=False, indent=indent)
+        out.write(text)
+        out.write("\n")
+        if stats is not None:
+            stats.add(text, toon)
+
+
+# ---------- Files ----------
+def _output_path(path: str, decode: bool, out_dir: Optional[str], root: str = "") -> str:
+    """
+    Output file next to the input, or under `out_dir` at the input's path relative to
+    `root` (the common parent of all inputs), so equal names in different folders stay apart.
+    """
+    stem, ext = os.path.splitext(os.path.basename(path))
+    new_ext = ".json" if decode else ".toon"
+    if ext == new_ext:
+        # Never overwrite the input itself
+        stem += ext
+    if out_dir is None:
+        return os.path.join(os.path.dirname(path), stem + new_ext)
+    rel_dir = os.path.relpath(os.path.dirname(os.path.abspath(path)), root) if root else ""
+    return os.path.normpath(os.path.join(out_dir, rel_dir, stem + new_ext))
+
+
+def output_paths(files: list, decode: bool, out_dir: Optional[str]) -> list:
+    """Output path of every input; raises ValueError if two inputs would write the same file."""
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in files]) if out_dir else ""
+    outputs = [_output_path(path, decode, out_dir, root) for path in files]
+    seen = {}
+    for path, out in zip(files, outputs):
+        key = os.path.normcase(os.path.abspath(out))
+        if key in seen:
+            raise ValueError(f"{seen[key]!r} and {path!r} would both be written to {out!r}")
+        seen[key] = path
+    return outputs
+
+
+def convert_file(path: str, out_path: Optional[str], decode: bool, options: dict,
+                 indent: Optional[int], with_stats: bool, expand_paths: bool = False) -> Optional[dict]:
+    """Convert one file (to `out_path`, or stdout when None); runs inside worker processes."""
+    stats = Stats(path) if with_stats else None
+    out = open(out_path, "w", encoding="utf-8") if out_path else sys.stdout
+    try:
+        with open(path, encoding="utf-8") as f:
+            if decode:
+                decode_stream(f, out, indent, stats, expand_paths)
+            else:
+                encode_stream(f, out, options, stats)
+    finally:
+        if out_path:
+            out.close()
+        else:
+            out.flush()
+    return stats.as_dict() if stats else None
+
+
+def expand_inputs(patterns: list) -> list:
+    """Expand globs (`**` included) into a de-duplicated list of files."""
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            raise FileNotFoundError(f"No files match {pattern!r}")
+        for path in matches:
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"Not a file: {path!r}")
+            if path not in files:
+                files.append(path)
+    return files
+
+
+# ---------- Benchmark ----------
+def bench_file(path: str, options: dict, repeat: int) -> dict:
+    """Time encoding and decoding of every record in a JSON/JSONL file."""
+    with open(path, encoding="utf-8") as f:
+        records = list(_json_records(f))
+    toons = [encode_toon(r, **options) for r in records]
+    json_bytes = sum(len(json.dumps(r, ensure_ascii=False).encode()) for r in records)
+    toon_bytes = sum(len(t.encode()) for t in toons)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for r in records:
+            encode_toon(r, **options)
+    encode_sec = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for t in toons:
+            decode_toon(t)
+    decode_sec = (time.perf_counter() - start) / repeat
+
+    return {"file": path, "records": len(records), "json_bytes": json_bytes, "toon_bytes": toon_bytes,
+            "encode_ms": round(encode_sec * 1000, 3), "decode_ms": round(decode_sec * 1000, 3),
+            "encode_mb_s": round(json_bytes / encode_sec / 1e6, 2) if encode_sec else 0.0,
+            "decode_mb_s": round(toon_bytes / decode_sec / 1e6, 2) if decode_sec else 0.0}
+
+
+# ---------- Entry point ----------
+def _print_stats(rows: list, err: TextIO):
+    if not rows:
+        return
+    approx = "" if all(r["exact_tokens"] for r in rows) else " (≈ tokens, install tiktoken for exact counts)"
+    err.write(f"{'File':40} | {'Records':>7} | {'JSON tok':>9} | {'TOON tok':>9} | {'Saved':>7}{approx}\n")
+    for r in rows:
+        err.write(f"{r['file'][-40:]:40} | {r['records']:>7} | {r['json_tokens']:>9} | "
+                  f"{r['toon_tokens']:>9} | {r['token_savings']:>6.2f}%\n")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="toon", description="Convert JSON/JSONL to TOON and back.")
+    parser.add_argument("inputs", nargs="*", help="Files or glob patterns (default: stdin, or '-')")
+    parser.add_argument("-d", "--decode", action="store_true", help="Convert TOON to JSON instead")
+    parser.add_argument("-o", "--out-dir", help="Write one output file per input into this directory")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes for multiple files")
+    parser.add_argument("--stats", action="store_true", help="Report per-file byte and token counts on stderr")
+    parser.add_argument("--bench", action="store_true", help="Benchmark encode/decode speed instead of converting")
+    parser.add_argument("--bench-repeat", type=int, default=5, help="Repetitions per file with --bench")
+    parser.add_argument("--indent", type=int, help="Indent decoded JSON (default: one record per line)")
+    parser.add_argument("--delimiter", choices=[",", "tab", "|", "auto"], help="Cell delimiter for tables")
+    parser.add_argument("--min-density", type=float, default=DEFAULT_MIN_DENSITY,
+                        help="Minimum filled-cell share for sparse tables")
+    parser.add_argument("--float-precision", type=int, help="Round floats to this many decimals")
+    parser.add_argument("--compact-floats", action="store_true", help="Write integral floats as ints")
+    parser.add_argument("--fold-keys", action="store_true", help="Fold single-key object chains into dotted paths")
+    parser.add_argument("--expand-paths", action="store_true", help="Expand dotted keys when decoding")
+    return parser
+
+
+def main(argv: Optional[list] = None) -> int:
+    args = build_parser().parse_args(argv)
+    options = {"min_density": args.min_density, "float_precision": args.float_precision,
+               "compact_floats": args.compact_floats, "key_folding": args.fold_keys,
+               "delimiter": "\t" if args.delimiter == "tab" else args.delimiter}
+
+    use_stdin = not args.inputs or args.inputs == ["-"]
+    if use_stdin and (args.out_dir or args.bench):
+        sys.stderr.write("toon: --out-dir and --bench need input files\n")
+        return 2
+
+    if use_stdin:
+        stats = Stats("<stdin>") if args.stats else None
+        stdin = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8") if hasattr(sys.stdin, "buffer") else sys.stdin
+        if args.decode:
+            decode_stream(stdin, sys.stdout, args.indent, stats, args.expand_paths)
+        else:
+            encode_stream(stdin, sys.stdout, options, stats)
+        sys.stdout.flush()
+        if stats:
+            _print_stats([stats.as_dict()], sys.stderr)
+        return 0
+
+    try:
+        files = expand_inputs(args.inputs)
+    except FileNotFoundError as e:
+        sys.stderr.write(f"toon: {e}\n")
+        return 1
+
+    if args.bench:
+        for path in files:
+            print(json.dumps(bench_file(path, options, args.bench_repeat)))
+        return 0
+
+    if len(files) == 1 and not args.out_dir:
+        jobs = [(files[0], None)]
+    else:
+        try:
+            jobs = list(zip(files, output_paths(files, args.decode, args.out_dir)))
+        except ValueError as e:
+            sys.stderr.write(f"toon: {e}\n")
+            return 1
+        for _, out in jobs:
+            os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+
+    if len(jobs) == 1 or args.jobs <= 1:
+        results = [convert_file(path, out, args.decode, options, args.indent, args.stats, args.expand_paths)
+                   for path, out in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(jobs))) as pool:
+            futures = [pool.submit(convert_file, path, out, args.decode, options, args.indent, args.stats,
+                                   args.expand_paths)
+                       for path, out in jobs]
+            results = [f.result() for f in futures]
+
+    if args.stats:
+        _print_stats([r for r in results if r], sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
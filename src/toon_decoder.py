@@ -0,0 +1,291 @@
+import json
+import re
+from typing import Any
+
+from src.toon_encoder import ABSENT
+
+# `[N]`, optionally followed by a delimiter marker (`[N|]`, `[N<tab>]`), fields and inline items
+_ARRAY_HEADER = re.compile(r"^\[(\d+)([\t|]?)\](?:\{(.*)\})?:(?: (.*))?$")
+# `#sampled[k]: strategy` line opening a table cut down by a token budget
+_SAMPLED = re.compile(r"^#sampled\[(\d+)\]")
+_SUBLIST = re.compile(r"^\[(\d+)\](.*)$", re.S)
+_NUMBER = re.compile(r"^-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?$")
+_SPECIAL_FLOATS = {"NaN": float("nan"), "nan": float("nan"),
+                   "Infinity": float("inf"), "inf": float("inf"),
+                   "-Infinity": float("-inf"), "-inf": float("-inf")}
+
+
+def _string_end(text: str, start: int) -> int:
+    """Return the index just past the quoted string starting at `start`."""
+    i = start + 1
+    while i < len(text):
+        ch = text[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if ch == '"':
+            return i + 1
+        i += 1
+    raise ValueError(f"Unterminated string: {text[start:]}")
+
+
+def _split_cells(text: str, delimiter: str = ",") -> list:
+    """Split a row on `delimiter`, ignoring delimiters inside strings and JSON fragments."""
+    if '"' not in text and "[" not in text and "{" not in text:
+        return text.split(delimiter)
+
+    cells, start, depth, i = [], 0, 0, 0
+    while i < len(text):
+        ch = text[i]
+        if ch == '"':
+            i = _string_end(text, i)
+            continue
+        if ch in "[{":
+            depth += 1
+        elif ch in "]}":
+            depth -= 1
+        elif ch == delimiter and depth == 0:
+            cells.append(text[start:i])
+            start = i + 1
+        i += 1
+    cells.append(text[start:])
+    return cells
+
+
+def _parse_scalar(token: str) -> Any:
+    """Parse a primitive written by the encoder (or by an LLM following the same rules)."""
+    token = token.strip()
+    if not token:
+        return ""
+    if token[0] == '"':
+        return json.loads(token)
+    if token in ("null", "None"):
+        return None
+    if token == "true":
+        return True
+    if token == "false":
+        return False
+    if _NUMBER.match(token):
+        return float(token) if any(c in token for c in ".eE") else int(token)
+    if token in _SPECIAL_FLOATS:
+        return _SPECIAL_FLOATS[token]
+    if token[0] in "[{":
+        # Nested values written as JSON fragments
+        try:
+            return json.loads(token)
+        except ValueError:
+            pass
+    return token
+
+
+def _parse_cell(cell: str, column: str, children: dict) -> Any:
+    """Parse a table cell, resolving `[N]a;b` sub-lists and `@i` child-table references."""
+    cell = cell.strip()
+    if cell.startswith("@") and cell[1:].isdigit():
+        return children[column][int(cell[1:])]
+
+    m = _SUBLIST.match(cell)
+    if m:
+        count, body = int(m.group(1)), m.group(2)
+        if count == 0 and not body:
+            return []
+        if body.startswith("@") and body[1:].isdigit():
+            start = int(body[1:])
+            return children[column][start:start + count]
+        if body:
+            items = [_parse_scalar(x) for x in _split_cells(body, ";")]
+            if len(items) != count:
+                raise ValueError(f"Sub-list declares {count} items but has {len(items)}: {cell!r}")
+            return items
+
+    return _parse_scalar(cell)
+
+
+def _parse_field(token: str) -> str:
+    token = token.strip()
+    return json.loads(token) if token.startswith('"') else token
+
+
+def _split_key(content: str):
+    """Split a `key: ...` / `key[N]...` line into (key, rest), or return None for plain values."""
+    if content.startswith('"'):
+        end = _string_end(content, 0)
+        key, rest = json.loads(content[:end]), content[end:]
+    else:
+        end = 0
+        while end < len(content) and content[end] not in ":[":
+            end += 1
+        key, rest = content[:end], content[end:]
+
+    if rest == ":" or rest.startswith(": "):
+        return key, rest
+    if rest.startswith("[") and _ARRAY_HEADER.match(rest):
+        return key, rest
+    return None
+
+
+def _set_path(obj: dict, path: list, value: Any):
+    """Set a value under a dotted-key path, creating (or merging into) nested objects."""
+    for part in path[:-1]:
+        obj = obj.setdefault(part, {})
+        if not isinstance(obj, dict):
+            raise ValueError(f"Cannot expand {'.'.join(path)!r}: {part!r} is not an object")
+    leaf = path[-1]
+    if leaf in obj:
+        if isinstance(obj[leaf], dict) and isinstance(value, dict):
+            for k, v in value.items():
+                _set_path(obj[leaf], [k], v)
+            return
+        raise ValueError(f"Cannot expand {'.'.join(path)!r}: key already set")
+    obj[leaf] = value
+
+
+class _Parser:
+    def __init__(self, text: str, expand_paths: bool = False):
+        self.expand_paths = expand_paths
+        self.lines = []
+        # Split on "\n" only: str.splitlines() also breaks on U+2028, U+0085 etc.,
+        # which the encoder leaves unescaped inside strings
+        for raw in text.split("\n"):
+            raw = raw.rstrip("\r")
+            if not raw.strip():
+                continue
+            stripped = raw.lstrip(" ")
+            self.lines.append(((len(raw) - len(stripped)) // 2, stripped))
+        self.pos = 0
+
+    def peek(self):
+        return self.lines[self.pos] if self.pos < len(self.lines) else None
+
+    def parse_value(self, depth: int) -> Any:
+        """Parse whatever value starts on the current line."""
+        _, content = self.lines[self.pos]
+        if content == "{}":
+            self.pos += 1
+            return {}
+        if content == "[]":
+            self.pos += 1
+            return []
+        if content.startswith("["):
+            self.pos += 1
+            return self.parse_array(content, depth)
+        if _split_key(content) is None:
+            self.pos += 1
+            return _parse_scalar(content)
+        return self.parse_object(depth)
+
+    def parse_object(self, depth: int) -> dict:
+        obj = {}
+        while (line := self.peek()) is not None and line[0] >= depth:
+            line_depth, content = line
+            if line_depth > depth:
+                raise ValueError(f"Unexpected indentation: {content!r}")
+            split = _split_key(content)
+            if split is None:
+                raise ValueError(f"Expected a key, got: {content!r}")
+            key, rest = split
+            self.pos += 1
+
+            if rest.startswith("["):
+                value = self.parse_array(rest, depth)
+            elif rest == ":":
+                nxt = self.peek()
+                value = self.parse_object(depth + 1) if nxt and nxt[0] > depth else {}
+            elif rest[2:] == "{}":
+                value = {}
+            elif rest[2:] == "[]":
+                value = []
+            else:
+                value = _parse_scalar(rest[2:])
+
+            # Folded `a.b.c` keys are unquoted; quoted keys keep their dots
+            if self.expand_paths and "." in key and not content.startswith('"'):
+                _set_path(obj, key.split("."), value)
+            else:
+                obj[key] = value
+        return obj
+
+    def parse_array(self, header: str, depth: int) -> list:
+        m = _ARRAY_HEADER.match(header)
+        if not m:
+            raise ValueError(f"Malformed array header: {header!r}")
+        count, delimiter, fields, inline = int(m.group(1)), m.group(2) or ",", m.group(3), m.group(4)
+
+        if fields is not None:
+            return self.parse_table(count, fields, depth + 1, delimiter)
+
+        if inline is not None:
+            items = [_parse_scalar(c) for c in _split_cells(inline, delimiter)]
+        else:
+            items = []
+            while (line := self.peek()) is not None and line[0] == depth + 1 and line[1].startswith("- "):
+                body = line[1][2:]
+                # Re-read the item body as if it started one level deeper
+                self.lines[self.pos] = (depth + 2, body)
+                items.append(self.parse_value(depth + 2))
+
+        if len(items) != count:
+            raise ValueError(f"Array declares {count} items but has {len(items)}")
+        return items
+
+    def parse_table(self, count: int, fields: str, depth: int, delimiter: str = ",") -> list:
+        columns = [_parse_field(f) for f in _split_cells(fields, delimiter)] if fields else []
+        if not columns:
+            return [{} for _ in range(count)]
+
+        # A sampled table shows fewer rows than its header declares
+        line = self.peek()
+        if line is not None and line[0] == depth and (m := _SAMPLED.match(line[1])):
+            self.pos += 1
+            count = int(m.group(1))
+
+        raw_rows = []
+        for _ in range(count):
+            line = self.peek()
+            if line is None or line[0] != depth:
+                raise ValueError(f"Table declares {count} rows but has {len(raw_rows)}")
+            self.pos += 1
+            cells = _split_cells(line[1], delimiter)
+            if len(cells) != len(columns):
+                raise ValueError(f"Row has {len(cells)} cells, expected {len(columns)}: {line[1]!r}")
+            raw_rows.append(cells)
+
+        # Child tables holding the nested objects of spilled columns
+        children = {}
+        while (line := self.peek()) is not None and line[0] == depth and line[1].startswith("@"):
+            split = _split_key(line[1][1:])
+            if split is None:
+                break
+            name, rest = split
+            m = _ARRAY_HEADER.match(rest)
+            if m.group(3) is None:
+                raise ValueError(f"Expected a child table header, got: {line[1]!r}")
+            self.pos += 1
+            children[name] = self.parse_table(int(m.group(1)), m.group(3), depth + 1, m.group(2) or ",")
+
+        # Summary of the rows left out by sampling; informational only, it is not decoded into rows
+        line = self.peek()
+        if line is not None and line[0] == depth and line[1].startswith("#omitted["):
+            m = _ARRAY_HEADER.match(line[1][len("#omitted"):])
+            self.pos += 1
+            self.parse_table(int(m.group(1)), m.group(3), depth + 1, m.group(2) or ",")
+
+        rows = []
+        for cells in raw_rows:
+            rows.append({col: _parse_cell(cell, col, children) for col, cell in zip(columns, cells)
+                         if cell.strip() != ABSENT})
+        return rows
+
+
+def decode_toon(text: str, expand_paths: bool = False) -> Any:
+    """
+    Decode TOON text produced by `encode_toon` back into Python data.
+    `expand_paths` turns unquoted dotted keys (from `key_folding`) back into nested objects.
+    """
+    parser = _Parser(text, expand_paths)
+    if not parser.lines:
+        return {}
+    value = parser.parse_value(parser.lines[0][0])
+    if parser.peek() is not None:
+        raise ValueError(f"Unexpected trailing content: {parser.peek()[1]!r}")
+    return value
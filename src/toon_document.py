@@ -0,0 +1,336 @@
+"""
+Lazy, memory-mapped view over a TOON file.
+
+    with ToonDocument.open("cache/employees.toon") as doc:
+        doc["employees"][5000]          # decodes one row
+        doc["employees"][100:110]       # decodes ten rows
+        doc["company"]["offices"]       # decodes one subtree
+
+Opening the file runs one linear scan that records where every key, table header and
+table row starts; values are decoded only when accessed. Table row offsets are kept for
+every `ROW_INDEX_STRIDE`-th row, so the index stays small even for very long tables.
+"""
+import mmap
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Any, Optional
+
+from src.toon_decoder import _ARRAY_HEADER, _SAMPLED, _Parser, _parse_cell, _parse_field, _split_cells, _split_key
+from src.toon_encoder import ABSENT
+
+# One row offset is indexed per this many rows; reaching a row scans at most STRIDE - 1 lines.
+ROW_INDEX_STRIDE = 64
+
+
+class _Node:
+    """Index entry for one key (or the root): where its text starts and ends."""
+    __slots__ = ("kind", "depth", "start", "end", "children")
+
+    def __init__(self, kind: str, depth: int, start: int):
+        self.kind = kind          # "object", "table" or "value"
+        self.depth = depth
+        self.start = start
+        self.end = start
+        self.children = None      # dict of key -> _Node for objects
+
+
+class _TableNode(_Node):
+    __slots__ = ("count", "fields", "delimiter", "row_offsets", "tables")
+
+    def __init__(self, depth: int, start: int, count: int, fields: list, delimiter: str):
+        super().__init__("table", depth, start)
+        self.count = count
+        self.fields = fields
+        self.delimiter = delimiter
+        self.row_offsets = array("Q")
+        self.tables = {}          # child tables of spilled columns, name -> _TableNode
+
+
+class _Lines:
+    """Line cursor over the mapped bytes, skipping blank lines."""
+
+    def __init__(self, mm):
+        self.mm = mm
+        self.size = len(mm)
+        self.pos = 0
+        self._peeked = None
+
+    def peek(self):
+        """Return (start, next_start, depth, content) of the next non-blank line, or None."""
+        if self._peeked is not None:
+            return self._peeked
+        pos = self.pos
+        while pos < self.size:
+            end = self.mm.find(b"\n", pos)
+            if end == -1:
+                end = self.size
+            raw = self.mm[pos:end].rstrip(b"\r")
+            stripped = raw.lstrip(b" ")
+            if stripped.strip():
+                self._peeked = (pos, end + 1, (len(raw) - len(stripped)) // 2, stripped.decode("utf-8"))
+                return self._peeked
+            pos = end + 1
+        return None
+
+    def advance(self):
+        self.pos = self.peek()[1]
+        self._peeked = None
+
+    def skip_rows(self, count: int, offsets: array):
+        """Skip `count` single-line rows, recording every ROW_INDEX_STRIDE-th row start."""
+        mm, pos = self.mm, self.pos
+        for i in range(count):
+            if i % ROW_INDEX_STRIDE == 0:
+                offsets.append(pos)
+            end = mm.find(b"\n", pos) if pos < self.size else -1
+            if end == -1:
+                # Row i is present only if unread bytes remain, and it must be the last one
+                present = i + 1 if pos < self.size else i
+                if present != count:
+                    raise ValueError(f"Table declares {count} rows but the file ends after {present}")
+                end = self.size
+            pos = end + 1
+        self.pos = pos
+        self._peeked = None
+
+
+class _Indexer:
+    def __init__(self, mm):
+        self.lines = _Lines(mm)
+
+    def index_root(self) -> _Node:
+        first = self.lines.peek()
+        if first is None:
+            node = _Node("object", 0, 0)
+            node.children = {}
+            return node
+        start, _, depth, content = first
+        m = _ARRAY_HEADER.match(content)
+        if m and m.group(3) is not None:
+            self.lines.advance()
+            return self.index_table(content, depth, start)
+        if content.startswith("[") or _split_key(content) is None:
+            node = _Node("value", depth, start)
+            self.skip_subtree(depth - 1)
+            node.end = self.lines.pos
+            return node
+        # The root object has no `key:` line of its own, so it starts at offset 0
+        return self.index_object(depth, 0)
+
+    def index_object(self, depth: int, start: int) -> _Node:
+        node = _Node("object", depth, start)
+        node.children = {}
+        while (line := self.lines.peek()) is not None and line[2] >= depth:
+            line_start, _, line_depth, content = line
+            if line_depth > depth:
+                raise ValueError(f"Unexpected indentation: {content!r}")
+            split = _split_key(content)
+            if split is None:
+                raise ValueError(f"Expected a key, got: {content!r}")
+            key, rest = split
+            self.lines.advance()
+
+            m = _ARRAY_HEADER.match(rest) if rest.startswith("[") else None
+            if m and m.group(3) is not None:
+                child = self.index_table(rest, depth, line_start)
+            elif rest == ":" and (nxt := self.lines.peek()) is not None and nxt[2] > depth:
+                child = self.index_object(depth + 1, nxt[0])
+                child.start = line_start
+            else:
+                # Scalars, inline arrays and expanded lists are decoded whole on access
+                child = _Node("value", depth, line_start)
+                self.skip_subtree(depth)
+                child.end = self.lines.pos
+            node.children[key] = child
+        node.end = self.lines.pos
+        return node
+
+    def index_table(self, header: str, depth: int, start: int) -> _TableNode:
+        m = _ARRAY_HEADER.match(header)
+        delimiter = m.group(2) or ","
+        fields = [_parse_field(f) for f in _split_cells(m.group(3), delimiter)] if m.group(3) else []
+        node = _TableNode(depth, start, int(m.group(1)), fields, delimiter)
+        if fields:
+            # Sampled tables hold fewer rows than the header declares
+            line = self.lines.peek()
+            if line is not None and line[2] == depth + 1 and (sampled := _SAMPLED.match(line[3])):
+                self.lines.advance()
+                node.count = int(sampled.group(1))
+            self.lines.skip_rows(node.count, node.row_offsets)
+            while (line := self.lines.peek()) is not None and line[2] == depth + 1 and line[3].startswith("@"):
+                split = _split_key(line[3][1:])
+                if split is None:
+                    break
+                self.lines.advance()
+                node.tables[split[0]] = self.index_table(split[1], depth + 1, line[0])
+            line = self.lines.peek()
+            if line is not None and line[2] == depth + 1 and line[3].startswith("#omitted["):
+                self.lines.advance()
+                self.skip_subtree(depth + 1)
+        node.end = self.lines.pos
+        return node
+
+    def skip_subtree(self, depth: int):
+        while (line := self.lines.peek()) is not None and line[2] > depth:
+            self.lines.advance()
+
+
+class TableView(Sequence):
+    """Sequence of the rows of one table, decoded on access."""
+
+    def __init__(self, doc: "ToonDocument", node: _TableNode):
+        self._doc = doc
+        self._node = node
+        self._tables = {name: TableView(doc, child) for name, child in node.tables.items()}
+
+    @property
+    def fields(self) -> list:
+        return list(self._node.fields)
+
+    def __len__(self) -> int:
+        return self._node.count
+
+    def __repr__(self) -> str:
+        return f"<TableView {self._node.count} rows {{{','.join(map(str, self._node.fields))}}}>"
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return list(self._iter_rows(start, stop))
+            return [self[i] for i in range(start, stop, step)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("table row index out of range")
+        return next(self._iter_rows(index, index + 1))
+
+    def __iter__(self):
+        return self._iter_rows(0, len(self))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, TableView)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def _row_start(self, index: int) -> int:
+        mm = self._doc._mm
+        pos = self._node.row_offsets[index // ROW_INDEX_STRIDE]
+        for _ in range(index % ROW_INDEX_STRIDE):
+            pos = mm.find(b"\n", pos) + 1
+        return pos
+
+    def _iter_rows(self, start: int, stop: int):
+        node, mm = self._node, self._doc._mm
+        if not node.fields:
+            for _ in range(start, stop):
+                yield {}
+            return
+        pos = self._row_start(start) if start < stop else 0
+        for _ in range(start, stop):
+            end = mm.find(b"\n", pos)
+            if end == -1:
+                end = len(mm)
+            line = mm[pos:end].decode("utf-8").rstrip("\r").lstrip(" ")
+            pos = end + 1
+            cells = _split_cells(line, node.delimiter)
+            if len(cells) != len(node.fields):
+                raise ValueError(f"Row has {len(cells)} cells, expected {len(node.fields)}: {line!r}")
+            yield {col: _parse_cell(cell, col, self._tables) for col, cell in zip(node.fields, cells)
+                   if cell.strip() != ABSENT}
+
+
+class ObjectView(Mapping):
+    """Mapping over one object's keys; values are decoded (or wrapped in views) on access."""
+
+    def __init__(self, doc: "ToonDocument", node: _Node):
+        self._doc = doc
+        self._node = node
+
+    def __iter__(self):
+        return iter(self._node.children)
+
+    def __len__(self) -> int:
+        return len(self._node.children)
+
+    def __contains__(self, key) -> bool:
+        return key in self._node.children
+
+    def __getitem__(self, key):
+        return self._doc._view(self._node.children[key], key)
+
+    def __repr__(self) -> str:
+        return f"<ObjectView keys={list(self._node.children)}>"
+
+    def to_dict(self) -> dict:
+        """Decode the whole object."""
+        return self._doc._decode(self._node, None)
+
+
+class ToonDocument:
+    """Read-only view over a memory-mapped TOON file."""
+
+    def __init__(self, mm: Optional[mmap.mmap], file):
+        self._mm = mm if mm is not None else b""
+        self._file = file
+        self._root = _Indexer(self._mm).index_root()
+        self.root = self._view(self._root, None)
+
+    @classmethod
+    def open(cls, path: str) -> "ToonDocument":
+        f = open(path, "rb")
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            mm = None
+        try:
+            return cls(mm, f)
+        except BaseException:
+            # Indexing failed (e.g. a truncated file): release the handles before re-raising
+            if mm is not None:
+                mm.close()
+            f.close()
+            raise
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getitem__(self, key):
+        return self.root[key]
+
+    def __len__(self) -> int:
+        return len(self.root)
+
+    def keys(self):
+        return self.root.keys()
+
+    def _view(self, node: _Node, key: Any):
+        if node.kind == "table":
+            return TableView(self, node)
+        if node.kind == "object":
+            return ObjectView(self, node)
+        return self._decode(node, key)
+
+    def _decode(self, node: _Node, key: Any) -> Any:
+        """Decode the text of one node (the whole document when `key` is None)."""
+        parser = _Parser(self._mm[node.start:node.end].decode("utf-8"))
+        if not parser.lines:
+            return {}
+        if key is None:
+            if node.kind == "object" and node.start != 0:
+                # A nested object: skip its `key:` line
+                parser.pos = 1
+                return parser.parse_object(node.depth)
+            return parser.parse_value(node.depth)
+        return next(iter(parser.parse_object(node.depth).values()))
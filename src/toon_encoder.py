@@ -1,67 +1,536 @@
 import json
-from typing import Any
-
-def encode_toon(data: Any, indent: int = 0) -> str:
-    """TOON encoder with tabular array, empty container, and nested dict support."""
-    spaces = "  " * indent
-
-    # Handle empty root dict
-    if isinstance(data, dict) and not data:
-        return f"{spaces}{{}}"
-
-    if isinstance(data, dict):
-        lines = []
-        for k, v in data.items():
-            # --- Handle empty dicts explicitly ---
-            if isinstance(v, dict):
-                if not v:
-                    lines.append(f"{spaces}{k}: {{}}")
-                else:
-                    lines.append(f"{spaces}{k}:")
-                    lines.append(encode_toon(v, indent + 1))
+import math
+import re
+from collections.abc import Mapping
+from functools import lru_cache, partial
+from types import MappingProxyType
+from typing import Any, Callable, NamedTuple, Optional, Union
+
+# Cell written for a key that a row of a sparse table does not have.
+# It decodes to a missing key, unlike ``null`` which decodes to None.
+ABSENT = "~"
+
+# Minimum share of filled cells for dicts with differing keys to stay tabular.
+DEFAULT_MIN_DENSITY = 0.6
+
+_MISSING = object()
+
+_NUMBER_LIKE = re.compile(r"^-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?$")
+_RESERVED_WORDS = {"true", "false", "null", "None", "NaN", "nan", "Infinity", "inf", "-Infinity", "-inf"}
+_UNSAFE_CHARS = re.compile(r'["\\\[\]{}\x00-\x1f]')
+_UNSAFE_FIELD_CHARS = re.compile(r'["\[\]{}\x00-\x1f]')
+_UNSAFE_KEY_CHARS = re.compile(r'[":\[\]{}\\\x00-\x1f]')
+
+# Keys that may be joined into a folded `a.b.c` path.
+_FOLDABLE_KEY = re.compile(r"^[A-Za-z_][\w-]*$")
+
+# Supported cell delimiters and the marker each one adds to an array header,
+# e.g. `items[3|]{a|b}:`. Comma is the default and has no marker.
+DELIMITERS = {",": "", "\t": "\t", "|": "|"}
+
+# Fields of the `#omitted` block that summarizes the rows left out of a sampled table.
+SUMMARY_FIELDS = ["column", "count", "min", "max", "mean", "distinct"]
+
+# Integral floats below this magnitude print shorter as ints than with repr().
+_MAX_COMPACT_FLOAT = 1e16
+
+# Entries per formatting cache of a ToonEncoder. Only strings up to
+# _CACHED_STRING_LENGTH characters are cached, so long text is never held on to.
+DEFAULT_CACHE_SIZE = 4096
+_CACHED_STRING_LENGTH = 64
+
+# Indentation strings built once per encoder; deeper levels are built on demand.
+_PRECOMPUTED_INDENTS = 32
+
+
+class _SampledRows(list):
+    """
+    Rows kept from a larger table by a token budget. The table header still shows
+    `total`, and `summary` (one dict per column, keyed by SUMMARY_FIELDS) describes
+    the rows that were left out.
+    """
+
+    def __init__(self, rows: list, columns: list, total: int, strategy: str, summary: list):
+        super().__init__(rows)
+        self.columns = columns
+        self.total = total
+        self.strategy = strategy
+        self.summary = summary
+
+
+class ToonOptions(NamedTuple):
+    """Encoding options; see `encode_toon` for what each one does."""
+    min_density: float = DEFAULT_MIN_DENSITY
+    float_precision: Union[int, dict, None] = None
+    compact_floats: bool = False
+    delimiter: Optional[str] = None
+    key_folding: bool = False
+
+    def precision_for(self, key: Any) -> Optional[int]:
+        if isinstance(self.float_precision, Mapping):
+            return self.float_precision.get(key)
+        return self.float_precision
+
+
+def _format_key(k: Any, key_folding: bool) -> str:
+    """Write a key bare, or quoted if it would not parse back (or contains a dot while folding)."""
+    k = str(k)
+    if (not k or k != k.strip() or k[0] in "-@#" or _UNSAFE_KEY_CHARS.search(k)
+            or (key_folding and "." in k)):
+        return json.dumps(k, ensure_ascii=False)
+    return k
+
+
+def _fold_key(k: Any, v: Any, siblings: dict):
+    """
+    Collapse a chain of single-key dicts under `k` into a dotted path.
+    Returns (path, last key of the chain, innermost value), or None when there is nothing to fold or the
+    path would collide with a sibling key that really contains dots.
+    """
+    if not isinstance(k, str) or not _FOLDABLE_KEY.match(k):
+        return None
+    path = [k]
+    while isinstance(v, dict) and len(v) == 1:
+        (child, inner), = v.items()
+        if not isinstance(child, str) or not _FOLDABLE_KEY.match(child):
+            break
+        path.append(child)
+        v = inner
+    folded = ".".join(path)
+    if len(path) == 1 or folded in siblings:
+        return None
+    return folded, path[-1], v
+
+
+def _format_float(v: float, precision: Optional[int], compact: bool) -> str:
+    """
+    Shortest round-trip form of a float (what repr() gives), optionally rounded to
+    `precision` decimals first; with `compact`, integral values are written as ints.
+    """
+    if not math.isfinite(v):
+        return json.dumps(v)
+    if precision is not None:
+        v = round(v, precision)
+    if compact and v.is_integer() and abs(v) < _MAX_COMPACT_FLOAT:
+        return str(int(v))
+    return repr(v)
+
 
-            # --- Handle lists ---
+def _format_numeric_column(values: list, precision: Optional[int], compact: bool):
+    """
+    Format a whole column at once if every present value is an int or float.
+    Returns the cell strings, or None when the column holds other types.
+    """
+    present = [v for v in values if v is not _MISSING and v is not None]
+    if not present:
+        return None
+    kinds = set(map(type, present))
+
+    if kinds == {int}:
+        formatted = list(map(str, present))
+    elif kinds <= {int, float}:
+        formatted = [_format_float(v, precision, compact) if type(v) is float else str(v) for v in present]
+    else:
+        return None
+
+    if len(present) == len(values):
+        return formatted
+    it = iter(formatted)
+    return [ABSENT if v is _MISSING else "null" if v is None else next(it) for v in values]
+
+
+def _always_quoted(v: str) -> bool:
+    """True if a string needs quotes whatever the delimiter is."""
+    return (not v or v != v.strip() or v in _RESERVED_WORDS or _NUMBER_LIKE.match(v) is not None
+            or v[0] in "@~#" or _UNSAFE_CHARS.search(v) is not None)
+
+
+def _quote_if_needed(v: str, delimiter: str, sub_list: bool = False) -> str:
+    """Leave a string bare unless it contains the delimiter or would not read back as-is."""
+    if _always_quoted(v) or delimiter in v or (sub_list and ";" in v):
+        return json.dumps(v, ensure_ascii=False)
+    return v
+
+
+def _format_string(v: str, delimiter: Optional[str], sub_list: bool) -> str:
+    """JSON-quote a string (no delimiter chosen), or quote it only when needed."""
+    if delimiter is None:
+        return json.dumps(v, ensure_ascii=False)
+    return _quote_if_needed(v, delimiter, sub_list)
+
+
+def _format_field(col: Any, delimiter: str) -> str:
+    """Format a table header field, quoting names that would break the header."""
+    col = str(col)
+    if not col or col != col.strip() or delimiter in col or _UNSAFE_FIELD_CHARS.search(col):
+        return json.dumps(col, ensure_ascii=False)
+    return col
+
+
+def _choose_delimiter(strings) -> str:
+    """Pick the delimiter that forces the fewest strings into quotes (comma on ties)."""
+    counts = dict.fromkeys(DELIMITERS, 0)
+    for v in strings:
+        if _always_quoted(v):
+            continue
+        for d in counts:
+            if d in v:
+                counts[d] += 1
+    return min(counts, key=counts.get)
+
+
+def _table_strings(rows: list, columns: list):
+    """Yield the strings that end up in a table's header, cells and sub-lists."""
+    for col in columns:
+        yield str(col)
+    for row in rows:
+        for v in row.values():
+            if isinstance(v, str):
+                yield v
             elif isinstance(v, list):
-                # Empty list
-                if len(v) == 0:
-                    lines.append(f"{spaces}{k}: []")
-
-                # Tabular array: uniform dicts with same keys
-                elif all(isinstance(x, dict) and x.keys() == v[0].keys() for x in v):
-                    headers = ",".join(v[0].keys())
-                    lines.append(f"{spaces}{k}[{len(v)}]{{{headers}}}:")
-                    for row in v:
-                        row_values = ",".join(json.dumps(vv, ensure_ascii=False) for vv in row.values())
-                        lines.append(f"{spaces}  {row_values}")
-
-                # Inline array of primitives
-                elif all(not isinstance(x, (dict, list)) for x in v):
-                    joined = ",".join(json.dumps(x, ensure_ascii=False) for x in v)
-                    lines.append(f"{spaces}{k}[{len(v)}]: {joined}")
-
-                # List of nested/mixed objects
-                else:
-                    lines.append(f"{spaces}{k}[{len(v)}]:")
-                    for item in v:
-                        lines.append(encode_toon(item, indent + 1))
+                yield from (x for x in v if isinstance(x, str))
+
+
+def _resolve_delimiter(opts: ToonOptions, strings) -> str:
+    if opts.delimiter == "auto":
+        return _choose_delimiter(strings)
+    return opts.delimiter or ","
+
+
+def _table_columns(v: list, min_density: float):
+    """
+    Return the ordered union of keys if a list of dicts should be encoded as a table.
+    Rows with missing keys are allowed as long as the filled-cell ratio reaches `min_density`.
+    """
+    if not all(isinstance(x, dict) for x in v):
+        return None
+
+    first = v[0].keys()
+    if all(x.keys() == first for x in v):
+        return list(first)
+
+    columns = {}
+    filled = 0
+    for row in v:
+        filled += len(row)
+        for key in row:
+            columns.setdefault(key, None)
+
+    if filled / (len(columns) * len(v)) < min_density:
+        return None
+    return list(columns)
 
-            # --- Scalars: handle bools and None explicitly ---
+
+def _spilled_children(values: list, min_density: float):
+    """Collect the nested objects of a column if they can go into a linked child table."""
+    nested = []
+    for cell in values:
+        if isinstance(cell, dict) and cell:
+            nested.append(cell)
+        elif isinstance(cell, list) and cell and all(isinstance(x, dict) for x in cell):
+            nested.extend(cell)
+    if nested and _table_columns(nested, min_density) is not None:
+        return nested
+    return None
+
+
+class ToonEncoder:
+    """
+    Reusable TOON encoder for one fixed set of options.
+
+        encoder = ToonEncoder(ToonOptions(delimiter="|"))
+        text = encoder.encode(data)
+
+    Indentation strings are built once, and formatted keys and short strings are kept
+    in bounded LRU caches, so a long-lived encoder gets faster on repeated keys and
+    values. Options cannot change after construction and each call writes into its own
+    output buffer, so one instance can be shared by any number of threads.
+    """
+    __slots__ = ("_options", "_indents", "_cached_key", "_cached_string")
+
+    def __init__(self, options: Optional[ToonOptions] = None, cache_size: int = DEFAULT_CACHE_SIZE):
+        options = options or ToonOptions()
+        if options.delimiter is not None and options.delimiter != "auto" and options.delimiter not in DELIMITERS:
+            raise ValueError(f"Unsupported delimiter {options.delimiter!r}; use ',', '\\t', '|' or 'auto'")
+        if isinstance(options.float_precision, Mapping):
+            # Private read-only copy: later changes to the caller's dict do not leak in
+            options = options._replace(float_precision=MappingProxyType(dict(options.float_precision)))
+        self._options = options
+        self._indents = tuple("  " * i for i in range(_PRECOMPUTED_INDENTS))
+        # functools' C lru_cache is thread-safe, including on free-threaded builds
+        self._cached_key = lru_cache(maxsize=cache_size)(partial(_format_key, key_folding=options.key_folding))
+        self._cached_string = lru_cache(maxsize=cache_size)(_format_string)
+
+    @property
+    def options(self) -> ToonOptions:
+        return self._options
+
+    def __repr__(self) -> str:
+        return f"ToonEncoder({self._options!r})"
+
+    def encode(self, data: Any, indent: int = 0, max_tokens: Optional[int] = None, strategy: str = "head_tail",
+               sort_by: Any = None, stratify_by: Any = None,
+               token_counter: Optional[Callable[[str], int]] = None) -> str:
+        """Encode `data`; the budget arguments are described in `encode_toon`."""
+        if max_tokens is not None:
+            from src.toon_budget import encode_within_budget
+            return encode_within_budget(data, indent, self, max_tokens, strategy, sort_by, stratify_by,
+                                        token_counter)
+        out = []
+        self._write(data, indent, out)
+        return "\n".join(out)
+
+    # ---------- Formatting ----------
+    def _spaces(self, indent: int) -> str:
+        if indent < _PRECOMPUTED_INDENTS:
+            return self._indents[indent]
+        return "  " * indent
+
+    def _key(self, k: Any) -> str:
+        if type(k) is str and len(k) <= _CACHED_STRING_LENGTH:
+            return self._cached_key(k)
+        return _format_key(k, self._options.key_folding)
+
+    def _string(self, v: str, delimiter: Optional[str] = None, sub_list: bool = False) -> str:
+        if len(v) <= _CACHED_STRING_LENGTH:
+            return self._cached_string(v, delimiter, sub_list)
+        return _format_string(v, delimiter, sub_list)
+
+    def _format_scalar(self, v: Any, key: Any = None) -> str:
+        """Format a scalar value for a `key: value` line."""
+        if isinstance(v, bool):
+            return "true" if v else "false"
+        if v is None:
+            return "None"
+        if isinstance(v, str):
+            return self._string(v)
+        if isinstance(v, float):
+            return _format_float(v, self._options.precision_for(key), self._options.compact_floats)
+        return f"{v}"
+
+    def _format_item(self, v: Any, key: Any, delimiter: str) -> str:
+        """Format a sub-list item, quoting strings only when they would not read back as-is."""
+        if isinstance(v, float):
+            return _format_float(v, self._options.precision_for(key), self._options.compact_floats)
+        if isinstance(v, str):
+            return self._string(v, delimiter, True)
+        return json.dumps(v, ensure_ascii=False)
+
+    def _format_inline(self, v: Any, key: Any, delimiter: str) -> str:
+        """
+        Format an item of an inline primitive array or a table cell. Strings are always
+        quoted unless a delimiter was chosen explicitly, in which case only when needed.
+        """
+        if isinstance(v, float):
+            return _format_float(v, self._options.precision_for(key), self._options.compact_floats)
+        if isinstance(v, str):
+            return self._string(v, delimiter if self._options.delimiter is not None else None)
+        return json.dumps(v, ensure_ascii=False)
+
+    def _format_column(self, col: Any, values: list, spilled: bool, delimiter: str) -> list:
+        """Format the cells of one table column."""
+        opts = self._options
+        numeric = _format_numeric_column(values, opts.precision_for(col), opts.compact_floats)
+        if numeric is not None:
+            return numeric
+
+        cells = []
+        next_ref = 0
+        for cell in values:
+            if cell is _MISSING:
+                cells.append(ABSENT)
+            elif isinstance(cell, list) and all(not isinstance(x, (dict, list)) for x in cell):
+                items = ";".join(self._format_item(x, col, delimiter) for x in cell)
+                cells.append(f"[{len(cell)}]{items}")
+            elif spilled and isinstance(cell, dict) and cell:
+                cells.append(f"@{next_ref}")
+                next_ref += 1
+            elif spilled and isinstance(cell, list) and all(isinstance(x, dict) for x in cell):
+                cells.append(f"[{len(cell)}]@{next_ref}")
+                next_ref += len(cell)
             else:
-                if isinstance(v, bool):
-                    val = "true" if v else "false"
-                elif v is None:
-                    val = "None"
-                elif isinstance(v, str):
-                    val = json.dumps(v, ensure_ascii=False)
+                cells.append(self._format_inline(cell, col, delimiter))
+        return cells
+
+    # ---------- Writing lines ----------
+    def _write_table(self, name: str, rows: list, columns: list, indent: int, out: list):
+        """
+        Write rows as a table, one column at a time. Primitive lists in a cell are written
+        as `[N]a;b;c`, with strings quoted only when they contain `;`, quotes or brackets,
+        or look like another type.
+        Nested objects are moved into a child table `@column` placed after the rows;
+        the cell then holds `@i` (one object) or `[N]@i` (N objects starting at row i).
+        Sampled tables get a `#sampled[k]` line before their rows and an `#omitted` summary
+        table after them.
+        """
+        opts = self._options
+        spaces = self._spaces(indent)
+        delimiter = _resolve_delimiter(opts, _table_strings(rows, columns))
+        headers = delimiter.join(_format_field(col, delimiter) for col in columns)
+        sampled = isinstance(rows, _SampledRows)
+        total = rows.total if sampled else len(rows)
+        out.append(f"{spaces}{name}[{total}{DELIMITERS[delimiter]}]{{{headers}}}:")
+        if not columns:
+            return
+        if sampled:
+            out.append(f"{spaces}  #sampled[{len(rows)}]: {rows.strategy}")
+
+        spilled = {}
+        column_cells = []
+        for col in columns:
+            values = [row.get(col, _MISSING) for row in rows]
+            children = _spilled_children(values, opts.min_density)
+            if children is not None:
+                spilled[col] = children
+            column_cells.append(self._format_column(col, values, children is not None, delimiter))
+
+        row_spaces = self._spaces(indent + 1)
+        for cells in zip(*column_cells):
+            out.append(f"{row_spaces}{delimiter.join(cells)}")
+
+        for col, children in spilled.items():
+            child_columns = _table_columns(children, opts.min_density)
+            self._write_table(f"@{self._key(col)}", children, child_columns, indent + 1, out)
+
+        if sampled and rows.summary:
+            self._write_table("#omitted", rows.summary, SUMMARY_FIELDS, indent + 1, out)
+
+    def _write_list_item(self, item: Any, indent: int, out: list):
+        """Write one item of an expanded list as a `- ` entry."""
+        spaces = self._spaces(indent)
+        if isinstance(item, (dict, list)) and item:
+            # Write one level deeper, then put the marker in front of the first line
+            first = len(out)
+            self._write(item, indent + 1, out)
+            out[first] = f"{spaces}- {out[first][len(spaces) + 2:]}"
+        elif isinstance(item, dict):
+            out.append(f"{spaces}- {{}}")
+        elif isinstance(item, list):
+            out.append(f"{spaces}- []")
+        else:
+            out.append(f"{spaces}- {self._format_scalar(item)}")
+
+    def _write_array(self, key: str, v: list, indent: int, out: list, raw_key: Any = None):
+        """
+        Write a list under the formatted `key` (empty for root arrays and list items);
+        `raw_key` is the dict key itself, used to look up its float precision.
+        """
+        spaces = self._spaces(indent)
+
+        # Table cut down by a token budget (possibly to no rows at all)
+        if isinstance(v, _SampledRows):
+            self._write_table(key, v, v.columns, indent, out)
+            return
+
+        # Empty list
+        if len(v) == 0:
+            out.append(f"{spaces}{key}: []" if key else f"{spaces}[]")
+            return
+
+        # Tabular array: dicts sharing (enough of) the same keys
+        columns = _table_columns(v, self._options.min_density)
+        if columns is not None:
+            self._write_table(key, v, columns, indent, out)
+            return
+
+        # Inline array of primitives
+        if all(not isinstance(x, (dict, list)) for x in v):
+            delimiter = _resolve_delimiter(self._options, (x for x in v if isinstance(x, str)))
+            joined = delimiter.join(self._format_inline(x, raw_key, delimiter) for x in v)
+            out.append(f"{spaces}{key}[{len(v)}{DELIMITERS[delimiter]}]: {joined}")
+            return
+
+        # List of nested/mixed objects
+        out.append(f"{spaces}{key}[{len(v)}]:")
+        for item in v:
+            self._write_list_item(item, indent + 1, out)
+
+    def _write(self, data: Any, indent: int, out: list):
+        spaces = self._spaces(indent)
+
+        # Handle empty root dict
+        if isinstance(data, dict) and not data:
+            out.append(f"{spaces}{{}}")
+
+        elif isinstance(data, dict):
+            key_folding = self._options.key_folding
+            for k, v in data.items():
+                folded = _fold_key(k, v, data) if key_folding else None
+                if folded is not None:
+                    # Float precision follows the last key of the chain, as without folding
+                    key, k, v = folded
                 else:
-                    val = v
-                lines.append(f"{spaces}{k}: {val}")
+                    key = self._key(k)
 
-        return "\n".join(lines)
+                # --- Handle empty dicts explicitly ---
+                if isinstance(v, dict):
+                    if not v:
+                        out.append(f"{spaces}{key}: {{}}")
+                    else:
+                        out.append(f"{spaces}{key}:")
+                        self._write(v, indent + 1, out)
 
-    elif isinstance(data, list):
-        # fallback for direct list inputs
-        return f"{spaces}[{len(data)}]: {','.join(map(str, data))}"
+                # --- Handle lists ---
+                elif isinstance(v, list):
+                    self._write_array(key, v, indent, out, k)
 
-    else:
-        return str(data)
+                # --- Scalars: handle bools and None explicitly ---
+                else:
+                    out.append(f"{spaces}{key}: {self._format_scalar(v, k)}")
+
+        elif isinstance(data, list):
+            # Root arrays use the same tabular/inline/expanded forms as keyed ones
+            self._write_array("", data, indent, out)
+
+        else:
+            # Root scalars are quoted like values, so "---", "a: b" or "12" read back as strings
+            out.append(self._format_scalar(data))
+
+
+@lru_cache(maxsize=32)
+def _cached_encoder(options: ToonOptions) -> ToonEncoder:
+    return ToonEncoder(options)
+
+
+def _shared_encoder(options: ToonOptions) -> ToonEncoder:
+    """The shared encoder for `options`, or a fresh one when they are unhashable."""
+    try:
+        return _cached_encoder(options)
+    except TypeError:
+        # e.g. a dict float_precision
+        return ToonEncoder(options)
+
+
+def encode_toon(data: Any, indent: int = 0, min_density: float = DEFAULT_MIN_DENSITY,
+                float_precision: Union[int, dict, None] = None, compact_floats: bool = False,
+                delimiter: Optional[str] = None, key_folding: bool = False,
+                max_tokens: Optional[int] = None, strategy: str = "head_tail", sort_by: Any = None,
+                stratify_by: Any = None, token_counter: Optional[Callable[[str], int]] = None) -> str:
+    """
+    TOON encoder with tabular array, empty container, and nested dict support.
+    Lists of dicts with optional fields are encoded as sparse tables when at least
+    `min_density` of their cells are filled; missing cells are written as `~`.
+
+    Floats use their shortest round-trip form. `float_precision` rounds them to a number
+    of decimals, either everywhere (int) or per column/key name (dict). `compact_floats`
+    writes integral floats such as 2.0 as ints (the value is kept, the type is not).
+
+    `delimiter` (",", "\\t" or "|") separates table cells and inline array items and is
+    declared in the array header; strings are then quoted only when needed. "auto" picks,
+    per table, the delimiter that forces the fewest strings into quotes.
+
+    `key_folding` collapses chains of single-key objects into dotted paths
+    (`service.metadata.version: v1`); keys that really contain dots are then quoted.
+    Decode with `decode_toon(text, expand_paths=True)` to restore the nesting.
+
+    `max_tokens` makes the encoding lossy when needed: table rows are sampled until the
+    output fits (counted with tiktoken's o200k_base unless `token_counter` is given).
+    `strategy` is "head_tail", "stratified" (by `stratify_by`, or a detected category
+    column) or "top_k" (largest `sort_by` values). See `src/toon_budget.py`.
+
+    Calls share one cached `ToonEncoder` per set of options; long-running services can
+    also hold their own `ToonEncoder(ToonOptions(...))`.
+    """
+    options = ToonOptions(min_density, float_precision, compact_floats, delimiter, key_folding)
+    return _shared_encoder(options).encode(data, indent, max_tokens, strategy, sort_by, stratify_by,
+                                           token_counter)
@@ -0,0 +1,89 @@
+import json
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.mock_openai_server import MockConfig, start_server
+
+
+def post(server, path, body):
+    req = urllib.request.Request(f"{server.base_url}{path}", data=json.dumps(body).encode(),
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=5) as res:
+        return res.read().decode()
+
+
+@pytest.fixture
+def server():
+    srv = start_server(MockConfig(seed=7))
+    yield srv
+    srv.stop()
+
+
+def test_chat_completion_returns_synthetic_toon(server):
+    res = json.loads(post(server, "/chat/completions", {"model": "m", "messages": [{"role": "user", "content": "hi"}]}))
+    content = res["choices"][0]["message"]["content"]
+    assert content.startswith("records[")
+    assert res["usage"]["total_tokens"] > 0
+
+
+def test_chat_completion_stream_reassembles(server):
+    stream = post(server, "/chat/completions", {"model": "m", "stream": True, "messages": []})
+    events = [line[6:] for line in stream.splitlines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    text = "".join(json.loads(e)["choices"][0]["delta"].get("content", "") for e in events[:-1])
+    assert text.startswith("records[")
+
+
+def test_responses_stream_ends_with_completed_event(server):
+    stream = post(server, "/responses", {"model": "m", "stream": True, "input": "hi"})
+    events = [json.loads(line[6:]) for line in stream.splitlines() if line.startswith("data: ")]
+    assert events[0]["type"] == "response.created"
+    assert events[-1]["type"] == "response.completed"
+    deltas = "".join(e["delta"] for e in events if e["type"] == "response.output_text.delta")
+    assert deltas == events[-1]["response"]["output"][0]["content"][0]["text"]
+
+
+def test_replay_and_rate_limit(tmp_path):
+    replay = tmp_path / "replay.jsonl"
+    replay.write_text(json.dumps({"match": "weather", "content": "city: London"}) + "\n"
+                      + json.dumps({"content": "fallback: true"}) + "\n")
+    srv = start_server(MockConfig(replay=str(replay), rate_limit=1))
+    try:
+        res = json.loads(post(srv, "/chat/completions", {"messages": [{"role": "user", "content": "the weather"}]}))
+        assert res["choices"][0]["message"]["content"] == "city: London"
+        with pytest.raises(urllib.error.HTTPError) as err:
+            post(srv, "/chat/completions", {"messages": []})
+        assert err.value.code == 429
+        assert "Retry-After" in err.value.headers
+        err.value.close()
+    finally:
+        srv.stop()
+
+
+def test_fractional_rate_limit_admits_requests():
+    srv = start_server(MockConfig(rate_limit=0.5))
+    try:
+        post(srv, "/chat/completions", {"messages": []})
+        with pytest.raises(urllib.error.HTTPError) as err:
+            post(srv, "/chat/completions", {"messages": []})
+        assert err.value.code == 429
+        assert 1.5 < float(err.value.headers["Retry-After"]) <= 2
+        err.value.close()
+    finally:
+        srv.stop()
+
+
+def test_token_rate_also_delays_non_streaming_replies(tmp_path):
+    replay = tmp_path / "replay.jsonl"
+    replay.write_text(json.dumps({"content": "a b c d e"}) + "\n")
+    srv = start_server(MockConfig(replay=str(replay), tokens_per_sec=10))
+    try:
+        for path, body in (("/chat/completions", {"messages": []}), ("/responses", {"input": "hi"})):
+            start = time.monotonic()
+            post(srv, path, body)
+            assert 0.45 <= time.monotonic() - start < 1.5
+    finally:
+        srv.stop()
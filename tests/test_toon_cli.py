@@ -0,0 +1,51 @@
+import io
+import json
+
+from src.toon_cli import RECORD_SEPARATOR, main
+
+
+def test_stdin_jsonl_streams_to_toon_and_back(monkeypatch, capsys):
+    records = [{"id": 1, "tags": ["a", "b"]}, {"id": 2, "tags": []}]
+    monkeypatch.setattr("sys.stdin", io.StringIO("".join(json.dumps(r) + "\n" for r in records)))
+    assert main([]) == 0
+    toon = capsys.readouterr().out
+    assert toon.splitlines() == ["id: 1", "tags[2]: \"a\",\"b\"", RECORD_SEPARATOR, "id: 2", "tags: []"]
+
+    monkeypatch.setattr("sys.stdin", io.StringIO(toon))
+    assert main(["--decode"]) == 0
+    assert [json.loads(line) for line in capsys.readouterr().out.splitlines()] == records
+
+
+def test_scalar_records_round_trip(monkeypatch, capsys):
+    records = ["---", "a: b", True, "12", None, 1.5, "", {"x": 1}]
+    monkeypatch.setattr("sys.stdin", io.StringIO("".join(json.dumps(r) + "\n" for r in records)))
+    assert main([]) == 0
+    toon = capsys.readouterr().out
+
+    monkeypatch.setattr("sys.stdin", io.StringIO(toon))
+    assert main(["--decode"]) == 0
+    assert [json.loads(line) for line in capsys.readouterr().out.splitlines()] == records
+
+def test_glob_of_files_writes_one_output_each_with_stats(tmp_path, capsys):
+    for name in ("a", "b"):
+        (tmp_path / f"{name}.json").write_text(json.dumps({"rows": [{"x": 1}, {"x": 2}], "name": name}, indent=2))
+    out_dir = tmp_path / "out"
+    assert main([str(tmp_path / "*.json"), "-o", str(out_dir), "-j", "2", "--stats"]) == 0
+
+    assert sorted(p.name for p in out_dir.iterdir()) == ["a.toon", "b.toon"]
+    assert (out_dir / "a.toon").read_text() == 'rows[2]{x}:\n  1\n  2\nname: "a"\n'
+    assert "a.json" in capsys.readouterr().err
+
+
+def test_same_names_in_sibling_folders_keep_their_folders(tmp_path):
+    for folder, v in (("a", 1), ("b", 2)):
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / "x.json").write_text(json.dumps({"v": v}))
+    out_dir = tmp_path / "out"
+    assert main([str(tmp_path / "**" / "*.json"), "-o", str(out_dir), "-j", "2"]) == 0
+    assert (out_dir / "a" / "x.toon").read_text() == "v: 1\n"
+    assert (out_dir / "b" / "x.toon").read_text() == "v: 2\n"
+
+    # Inputs that would still share an output file are refused up front
+    (tmp_path / "a" / "x.jsonl").write_text(json.dumps({"v": 3}))
+    assert main([str(tmp_path / "a" / "x.json"), str(tmp_path / "a" / "x.jsonl"), "-o", str(out_dir)]) == 1
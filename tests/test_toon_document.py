@@ -0,0 +1,52 @@
+import gc
+import warnings
+from pathlib import Path
+
+import pytest
+
+from src.toon_decoder import decode_toon
+from src.toon_document import ROW_INDEX_STRIDE, ObjectView, TableView, ToonDocument
+from src.toon_encoder import encode_toon
+
+
+def write_toon(tmp_path, data, **options):
+    path = tmp_path / "doc.toon"
+    path.write_text(encode_toon(data, **options), encoding="utf-8")
+    return str(path)
+
+
+def test_random_row_access_and_slices(tmp_path):
+    rows = [{"id": i, "name": f"user{i}", "tags": ["a", "b"][: i % 3]} for i in range(ROW_INDEX_STRIDE * 3 + 5)]
+    data = {"meta": {"source": "test", "nested": {"n": 1}}, "employees": rows, "tail": "end"}
+    with ToonDocument.open(write_toon(tmp_path, data, delimiter="|")) as doc:
+        employees = doc["employees"]
+        assert isinstance(employees, TableView)
+        assert len(employees) == len(rows)
+        assert employees[ROW_INDEX_STRIDE + 7] == rows[ROW_INDEX_STRIDE + 7]
+        assert employees[-1] == rows[-1]
+        assert employees[60:70] == rows[60:70]
+        assert employees[::50] == rows[::50]
+        assert isinstance(doc["meta"], ObjectView)
+        assert doc["meta"]["nested"] == {"n": 1}
+        assert doc["tail"] == "end"
+        assert doc.root.to_dict() == data
+
+
+def test_child_tables_and_root_tables(tmp_path):
+    data = [{"name": "Eng", "staff": [{"id": 1}, {"id": 2}]}, {"name": "Ops", "staff": [{"id": 3}]}]
+    path = write_toon(tmp_path, data)
+    with ToonDocument.open(path) as doc:
+        assert doc[1] == data[1]
+        assert list(doc.root) == decode_toon(Path(path).read_text())
+
+
+@pytest.mark.parametrize("text", ["rows[5]{x}:\n  1\n  2\n", "rows[5]{x}:\n  1\n  2", "rows[3]{x}:\n  1\n  2\n"])
+def test_truncated_table_reports_rows_present_and_closes_file(tmp_path, text):
+    path = tmp_path / "bad.toon"
+    path.write_text(text, encoding="utf-8")
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", ResourceWarning)
+        with pytest.raises(ValueError, match="the file ends after 2$"):
+            ToonDocument.open(str(path))
+        gc.collect()
+    assert not [w for w in caught if issubclass(w.category, ResourceWarning)]
@@ -0,0 +1,220 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.toon_encoder import ToonEncoder, ToonOptions, encode_toon
+from src.toon_decoder import decode_toon
+
+
+# ---------- Sparse tables ----------
+def test_sparse_rows_use_union_of_keys():
+    data = {"users": [
+        {"id": 1, "name": "Alice", "email": "a@x.io"},
+        {"name": "Bob", "id": 2},
+        {"id": 3, "name": "Cara", "email": None},
+    ]}
+    toon = encode_toon(data)
+    assert toon.splitlines() == [
+        "users[3]{id,name,email}:",
+        '  1,"Alice","a@x.io"',
+        '  2,"Bob",~',
+        '  3,"Cara",null',
+    ]
+    assert decode_toon(toon) == data
+
+
+def test_low_density_falls_back_to_expanded_items():
+    data = {"events": [{"a": 1}, {"b": 2}, {"c": 3}]}
+    toon = encode_toon(data)
+    assert toon.startswith("events[3]:\n  - a: 1")
+    assert decode_toon(toon) == data
+    assert encode_toon(data, min_density=0.3).startswith("events[3]{a,b,c}:")
+
+
+def test_roundtrip_mixed_structures():
+    data = {
+        "matrix": [[1, 2], [3, 4]],
+        "mixed": [1, "two", None, {"k": "v"}, []],
+        "nested": {"deep": {"flag": True, "empty": {}}},
+        "records": [{"id": 1}, {"id": 2}],
+    }
+    assert decode_toon(encode_toon(data)) == data
+
+
+def test_unicode_line_separators_inside_strings_round_trip():
+    data = {"s": "a\u2028b\u0085c", "rows": [{"t": "x\u2028y", "tags": ["p\u0085q", "r"]}, {"t": "z", "tags": []}]}
+    for options in ({}, {"delimiter": "|"}, {"delimiter": "\t"}, {"delimiter": "auto"}, {"key_folding": True}):
+        assert decode_toon(encode_toon(data, **options)) == data
+
+
+# ---------- Nested values inside tables ----------
+def test_primitive_lists_become_length_prefixed_sublists():
+    data = {"employees": [
+        {"id": 1, "projects": ["Aurora", "Nebula"]},
+        {"id": 2, "projects": []},
+        {"id": 3, "projects": ["a;b", "true"]},
+    ]}
+    toon = encode_toon(data)
+    assert toon.splitlines() == [
+        "employees[3]{id,projects}:",
+        "  1,[2]Aurora;Nebula",
+        "  2,[0]",
+        '  3,[2]"a;b";"true"',
+    ]
+    assert decode_toon(toon) == data
+
+
+def test_nested_objects_spill_into_child_table():
+    data = {"departments": [
+        {"name": "Eng", "lead": {"id": 1}, "staff": [{"id": 1}, {"id": 2}]},
+        {"name": "Ops", "lead": {"id": 3}, "staff": [{"id": 3}]},
+    ]}
+    toon = encode_toon(data)
+    assert toon.splitlines() == [
+        "departments[2]{name,lead,staff}:",
+        '  "Eng",@0,[2]@0',
+        '  "Ops",@1,[1]@2',
+        "  @lead[2]{id}:",
+        "    1",
+        "    3",
+        "  @staff[3]{id}:",
+        "    1",
+        "    2",
+        "    3",
+    ]
+    assert decode_toon(toon) == data
+
+
+# ---------- Numeric formatting ----------
+def test_float_columns_use_shortest_form_and_optional_precision():
+    data = {"metrics": [{"cpu": 0.1 + 0.2, "mem": 2.0}, {"cpu": 1.25, "mem": None}]}
+    assert encode_toon(data).splitlines()[1:] == ["  0.30000000000000004,2.0", "  1.25,null"]
+
+    toon = encode_toon(data, float_precision={"cpu": 2}, compact_floats=True)
+    assert toon.splitlines()[1:] == ["  0.3,2", "  1.25,null"]
+    assert decode_toon(toon) == {"metrics": [{"cpu": 0.3, "mem": 2}, {"cpu": 1.25, "mem": None}]}
+    assert encode_toon(0.1 + 0.2, float_precision=3) == "0.3"
+
+
+# ---------- Delimiters ----------
+def test_explicit_delimiter_is_declared_and_reduces_quoting():
+    data = {"people": [{"name": "Smith, John", "city": "Rome"}, {"name": "Doe, Jane", "city": "a|b"}]}
+    toon = encode_toon(data, delimiter="|")
+    assert toon.splitlines() == [
+        "people[2|]{name|city}:",
+        "  Smith, John|Rome",
+        '  Doe, Jane|"a|b"',
+    ]
+    assert decode_toon(toon) == data
+
+
+def test_auto_delimiter_picks_fewest_quotes_per_table():
+    data = {
+        "plain": ["a", "b"],
+        "text": [{"t": "x, y"}, {"t": "z, w"}],
+        "mixed": [{"t": "x, y|z"}, {"t": "1\t2"}],
+    }
+    lines = encode_toon(data, delimiter="auto").splitlines()
+    assert lines[0] == "plain[2]: a,b"
+    assert lines[1] == "text[2\t]{t}:"
+    assert lines[4] == "mixed[2\t]{t}:"
+    assert decode_toon("\n".join(lines)) == data
+
+
+# ---------- Key folding ----------
+def test_key_folding_collapses_single_key_chains():
+    data = {
+        "service": {"metadata": {"version": "v1.2.3"}, "spec": {"replicas": 3}},
+        "a.b": {"c": 1},
+        "x": {"y": 1},
+        "x.y": 2,
+    }
+    toon = encode_toon(data, key_folding=True)
+    assert toon.splitlines() == [
+        "service:",
+        '  metadata.version: "v1.2.3"',
+        "  spec.replicas: 3",
+        '"a.b":',
+        "  c: 1",
+        "x:",
+        "  y: 1",
+        '"x.y": 2',
+    ]
+    assert decode_toon(toon, expand_paths=True) == data
+    assert decode_toon(toon)["service"] == {"metadata.version": "v1.2.3", "spec.replicas": 3}
+
+
+def test_key_folding_keeps_per_key_float_precision():
+    data = {"metrics": {"cpu": 0.123456}, "a": {"cpu": [0.12345, 1.5]}, "a:b": [0.12345]}
+    precision = {"cpu": 2, "a:b": 1}
+    plain = encode_toon(data, float_precision=precision).splitlines()
+    folded = encode_toon(data, float_precision=precision, key_folding=True).splitlines()
+    assert plain == ["metrics:", "  cpu: 0.12", "a:", "  cpu[2]: 0.12,1.5", '"a:b"[1]: 0.1']
+    assert folded == ["metrics.cpu: 0.12", "a.cpu[2]: 0.12,1.5", '"a:b"[1]: 0.1']
+
+
+# ---------- Token budget ----------
+def count_words(text):
+    return len(text.replace(",", " ").split())
+
+
+def test_max_tokens_samples_rows_and_summarizes_the_rest():
+    rows = [{"id": i, "team": ["red", "blue"][i % 2], "score": i * 10} for i in range(200)]
+    data = {"title": "scores", "rows": rows}
+    toon = encode_toon(data, max_tokens=120, strategy="top_k", sort_by="score", token_counter=count_words)
+    assert count_words(toon) <= 120
+
+    lines = toon.splitlines()
+    assert lines[1] == "rows[200]{id,team,score}:"
+    assert lines[2].startswith("  #sampled[") and lines[2].endswith("]: top_k score")
+
+    decoded = decode_toon(toon)
+    kept = decoded["rows"]
+    assert decoded["title"] == "scores" and 0 < len(kept) < 200
+    assert kept == rows[200 - len(kept):]
+    omitted = rows[:200 - len(kept)]
+    summary = lines.index("  #omitted[3]{column,count,min,max,mean,distinct}:")
+    assert lines[summary + 1] == f'    "id",{len(omitted)},0,{len(omitted) - 1},{(len(omitted) - 1) / 2},{len(omitted)}'
+    assert lines[summary + 2] == f'    "team",{len(omitted)},~,~,~,2'
+
+
+def test_max_tokens_strategies_and_limits():
+    rows = [{"kind": "a" if i < 90 else "b", "n": i} for i in range(100)]
+    fits = encode_toon(rows, max_tokens=10_000, token_counter=count_words)
+    assert fits == encode_toon(rows)
+
+    head_tail = decode_toon(encode_toon(rows, max_tokens=60, token_counter=count_words))
+    assert head_tail[0] == rows[0] and head_tail[-1] == rows[-1]
+
+    stratified = decode_toon(encode_toon(rows, max_tokens=60, strategy="stratified", token_counter=count_words))
+    assert {r["kind"] for r in stratified} == {"a", "b"}
+
+    with pytest.raises(ValueError):
+        encode_toon({"text": "too many words here"}, max_tokens=2, token_counter=count_words)
+    with pytest.raises(ValueError):
+        encode_toon(rows, max_tokens=60, strategy="top_k", token_counter=count_words)
+
+
+# ---------- Reusable encoder ----------
+def test_encoder_matches_encode_toon_and_freezes_options():
+    precision = {"price": 1}
+    encoder = ToonEncoder(ToonOptions(float_precision=precision, delimiter="|"), cache_size=2)
+    precision["price"] = 5
+    data = {"items": [{"sku": "A|1", "price": 2.345}, {"sku": "B", "price": 9.99}], "note": "x" * 100}
+    assert encoder.encode(data) == encode_toon(data, float_precision={"price": 1}, delimiter="|")
+    assert encoder.encode(data, indent=1) == encode_toon(data, 1, float_precision={"price": 1}, delimiter="|")
+    with pytest.raises(AttributeError):
+        encoder.options = ToonOptions()
+    with pytest.raises(ValueError):
+        ToonEncoder(ToonOptions(delimiter=";"))
+
+
+def test_encoder_shared_across_threads():
+    encoder = ToonEncoder(ToonOptions(delimiter="auto", key_folding=True))
+    payloads = [{"id": i, "user": {"name": f"u{i % 7}"}, "rows": [{"k": f"v{i}", "n": j} for j in range(i % 4)]}
+                for i in range(400)]
+    expected = [encoder.encode(p) for p in payloads]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for _ in range(5):
+            assert list(pool.map(encoder.encode, payloads)) == expected
+    assert [decode_toon(t, expand_paths=True) for t in expected] == payloads